@@ -1,8 +1,17 @@
+import argparse
+import json
 import shutil
 import os
 
-# Set working directory
-os.chdir(r"C:\Users\Abhit sahu\football_scout_ai\backend-py")
+# Run from the folder this script lives in (runs/ paths are relative to it)
+os.chdir(os.path.dirname(os.path.abspath(__file__)))
+
+parser = argparse.ArgumentParser(description="Copy a trained ball model to football_ball.pt")
+parser.add_argument("--benchmark", default=None,
+                    help="Pareto table from 'python test_ball_model.py --benchmark' to pick the model from")
+parser.add_argument("--latency-budget-ms", type=float, default=None,
+                    help="With --benchmark: pick the most accurate model at or under this CPU ms/frame")
+args = parser.parse_args()
 
 print("="*60)
 print("Copy Trained Model")
@@ -12,6 +21,30 @@ print("="*60)
 source = "runs/detect/football_ball_detection/weights/best.pt"
 destination = "football_ball.pt"
 
+if args.benchmark:
+    with open(args.benchmark) as f:
+        rows = json.load(f)["rows"]
+
+    candidates = [
+        row for row in rows
+        if row["pareto"]
+        and (args.latency_budget_ms is None or row["ms_per_frame"] <= args.latency_budget_ms)
+    ]
+    if not candidates:
+        print(f"\n❌ No benchmarked model meets the latency budget of {args.latency_budget_ms} ms/frame")
+        exit(1)
+
+    best = max(candidates, key=lambda row: row["map50"])
+    source = best["weights"]
+    # Exported variants keep their own extension (e.g. .onnx) or folder suffix (e.g. _openvino_model)
+    if best["format"] != "pytorch":
+        if os.path.isdir(source):
+            destination = "football_ball_" + "_".join(os.path.basename(source.rstrip("/\\")).rsplit("_", 2)[1:])
+        else:
+            destination = "football_ball" + os.path.splitext(source)[1]
+    print(f"\nSelected {best['model']} [{best['format']}] at imgsz={best['imgsz']}:")
+    print(f"  mAP50: {best['map50']:.4f}, {best['ms_per_frame']:.1f} ms/frame ({best['fps']:.1f} fps)")
+
 # Check if source exists
 if not os.path.exists(source):
     print(f"\n❌ Trained model not found at: {source}")
@@ -20,11 +53,15 @@ if not os.path.exists(source):
 
 # Copy the model
 try:
-    shutil.copy(source, destination)
+    if os.path.isdir(source):
+        shutil.copytree(source, destination, dirs_exist_ok=True)
+    else:
+        shutil.copy(source, destination)
     print(f"\n✓ Model copied successfully!")
     print(f"  From: {source}")
     print(f"  To: {destination}")
-    print(f"\nNext step: Update main.py to use 'football_ball.pt'")
+    if args.benchmark:
+        print(f"  Run inference with imgsz={best['imgsz']} to match the benchmark")
+    print(f"\nNext step: Update main.py to use '{destination}'")
 except Exception as e:
     print(f"\n❌ Error copying model: {e}")
-
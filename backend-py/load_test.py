@@ -0,0 +1,305 @@
+"""
+Local load test for the /process_video endpoint.
+
+Replays the request made by PerformanceMetricsService.processVideoAndSaveMetrics
+(multipart upload with a `jersey_number` field and a `video` file named
+football.mp4) against a locally running main.py, and reports latency
+percentiles, error/429 rates, throughput and the worker's CPU/memory usage.
+
+Examples:
+    # 4 requests in flight, back-to-back, using recorded clips
+    python load_test.py --clips clips/ --concurrency 4 --requests 40
+
+    # Open-loop arrivals at 0.5 requests/sec with generated clips
+    python load_test.py --synthetic 3 --rate 0.5 --requests 30
+
+Synthetic clips are plain drawings (green pitch, moving blobs), so YOLO will
+usually reject them as "not a football match" (HTTP 400). They exercise the
+upload and validation path only; use recorded clips to load the full pipeline.
+"""
+import argparse
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+
+import cv2
+import numpy as np
+import psutil
+import requests
+
+VIDEO_EXTENSIONS = (".mp4", ".mov", ".avi", ".mkv")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Load test the /process_video endpoint")
+    parser.add_argument("--url", default="http://127.0.0.1:5003/process_video",
+                        help="Endpoint to call (same as the Node backend uses)")
+    parser.add_argument("--clips", nargs="*", default=[],
+                        help="Video files or directories of videos to upload")
+    parser.add_argument("--synthetic", type=int, default=0,
+                        help="Number of synthetic clips to generate and add to the pool")
+    parser.add_argument("--synthetic-seconds", type=float, default=5.0,
+                        help="Length of each synthetic clip in seconds")
+    parser.add_argument("--concurrency", type=int, default=2,
+                        help="Maximum number of requests in flight (with --rate, extra arrivals "
+                             "wait client-side and that wait counts towards latency)")
+    parser.add_argument("--rate", type=float, default=None,
+                        help="Open-loop arrival rate in requests/sec (Poisson). "
+                             "Omit to send back-to-back with --concurrency workers")
+    parser.add_argument("--requests", type=int, default=20,
+                        help="Total number of requests to send")
+    parser.add_argument("--jersey-number", type=int, default=7,
+                        help="jersey_number form field sent with each request")
+    parser.add_argument("--timeout", type=float, default=600.0,
+                        help="Per-request timeout in seconds")
+    parser.add_argument("--server-pid", type=int, default=None,
+                        help="PID of the Python service (default: process listening on the URL's port)")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed for clip choice and arrivals")
+    parser.add_argument("--output", default=None, help="Write the report as JSON to this path")
+    return parser.parse_args()
+
+
+def collect_clips(paths):
+    """Expand files and directories into a sorted list of video files."""
+    clips = []
+    for path in paths:
+        if os.path.isdir(path):
+            clips.extend(
+                os.path.join(path, name) for name in sorted(os.listdir(path))
+                if name.lower().endswith(VIDEO_EXTENSIONS)
+            )
+        elif os.path.isfile(path):
+            clips.append(path)
+        else:
+            print(f"⚠ Skipping missing clip: {path}")
+    return clips
+
+
+def make_synthetic_clip(path, seconds, seed, fps=25, width=1280, height=720):
+    """Write a simple pitch-like clip: green field, moving player blobs and a ball."""
+    rng = np.random.default_rng(seed)
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"mp4v"), fps, (width, height))
+    players = rng.uniform([0, 0], [width, height], size=(12, 2))
+    velocities = rng.normal(0, 4, size=(12, 2))
+    colors = [(255, 255, 255) if i % 2 else (40, 40, 200) for i in range(12)]
+    ball = np.array([width / 2, height / 2])
+    ball_velocity = rng.normal(0, 10, size=2)
+
+    for _ in range(int(seconds * fps)):
+        frame = np.full((height, width, 3), (40, 140, 40), dtype=np.uint8)
+        players = np.clip(players + velocities, 0, [width - 1, height - 1])
+        ball = np.clip(ball + ball_velocity, 0, [width - 1, height - 1])
+        for (x, y), color in zip(players.astype(int), colors):
+            cv2.rectangle(frame, (x - 10, y - 30), (x + 10, y + 30), color, -1)
+        cv2.circle(frame, tuple(ball.astype(int)), 6, (255, 255, 255), -1)
+        writer.write(frame)
+    writer.release()
+
+
+def find_server_process(url, server_pid):
+    """Return the psutil.Process serving the endpoint, or None if it cannot be found."""
+    if server_pid is not None:
+        return psutil.Process(server_pid)
+
+    port = urlparse(url).port or 80
+    try:
+        for conn in psutil.net_connections(kind="tcp"):
+            if conn.status == psutil.CONN_LISTEN and conn.laddr.port == port and conn.pid:
+                return psutil.Process(conn.pid)
+    except psutil.AccessDenied:
+        pass
+    return None
+
+
+class ResourceSampler(threading.Thread):
+    """Samples CPU % and RSS of the server process (and its children) in the background."""
+
+    def __init__(self, process, interval=0.5):
+        super().__init__(daemon=True)
+        self.process = process
+        self.interval = interval
+        self.cpu_samples = []
+        self.rss_samples = []
+        self._stop_event = threading.Event()
+
+    def _processes(self):
+        return [self.process] + self.process.children(recursive=True)
+
+    def run(self):
+        for proc in self._processes():
+            proc.cpu_percent(None)  # Prime the counters
+        while not self._stop_event.wait(self.interval):
+            try:
+                procs = self._processes()
+                self.cpu_samples.append(sum(p.cpu_percent(None) for p in procs))
+                self.rss_samples.append(sum(p.memory_info().rss for p in procs))
+            except psutil.Error:
+                break
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+
+def send_request(url, clip, jersey_number, timeout):
+    """Upload one clip the way the Node backend does; return (status, latency_seconds)."""
+    start = time.perf_counter()
+    try:
+        with open(clip, "rb") as f:
+            response = requests.post(
+                url,
+                data={"jersey_number": str(jersey_number)},
+                files={"video": ("football.mp4", f, "video/mp4")},
+                timeout=timeout,
+            )
+        status = response.status_code
+    except requests.RequestException as e:
+        status = type(e).__name__
+    return status, time.perf_counter() - start
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a list (None when empty)."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, int(np.ceil(pct / 100.0 * len(ordered))))
+    return ordered[rank - 1]
+
+
+def run_load_test(args, clips):
+    rng = random.Random(args.seed)
+    results = []
+    results_lock = threading.Lock()
+
+    def task(clip, arrival):
+        status, service_time = send_request(args.url, clip, args.jersey_number, args.timeout)
+        # Open loop: measure from the scheduled arrival, so time spent queued client-side
+        # behind busy workers counts (otherwise overload hides in the tail percentiles)
+        latency = time.perf_counter() - arrival if args.rate else service_time
+        with results_lock:
+            results.append((status, latency))
+            done = len(results)
+        print(f"[{done}/{args.requests}] {os.path.basename(clip)} -> {status} in {latency:.2f}s")
+
+    start = time.perf_counter()
+    next_arrival = start
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        for _ in range(args.requests):
+            if args.rate:
+                # Open loop: Poisson arrivals on a fixed schedule, independent of response times
+                next_arrival += rng.expovariate(args.rate)
+                time.sleep(max(0.0, next_arrival - time.perf_counter()))
+            pool.submit(task, rng.choice(clips), next_arrival)
+    wall_time = time.perf_counter() - start
+    return results, wall_time
+
+
+def build_report(args, results, wall_time, sampler):
+    statuses = Counter(str(status) for status, _ in results)
+    ok_latencies = [latency for status, latency in results if status == 200]
+    total = len(results)
+    rejected = statuses.get("429", 0)
+    errors = total - len(ok_latencies) - rejected
+
+    report = {
+        "url": args.url,
+        "concurrency": args.concurrency,
+        "arrival_rate": args.rate,
+        "requests": total,
+        "status_counts": dict(statuses),
+        "success_rate": len(ok_latencies) / total if total else 0.0,
+        "error_rate": errors / total if total else 0.0,
+        "rate_limited_rate": rejected / total if total else 0.0,
+        "wall_time_s": wall_time,
+        "throughput_rps": len(ok_latencies) / wall_time if wall_time > 0 else 0.0,
+        "latency_s": {
+            "p50": percentile(ok_latencies, 50),
+            "p95": percentile(ok_latencies, 95),
+            "p99": percentile(ok_latencies, 99),
+            "max": max(ok_latencies) if ok_latencies else None,
+        },
+    }
+    if sampler is not None and sampler.cpu_samples:
+        report["server"] = {
+            "pid": sampler.process.pid,
+            "cpu_percent_avg": float(np.mean(sampler.cpu_samples)),
+            "cpu_percent_max": float(np.max(sampler.cpu_samples)),
+            "rss_mb_avg": float(np.mean(sampler.rss_samples)) / 1024 ** 2,
+            "rss_mb_max": float(np.max(sampler.rss_samples)) / 1024 ** 2,
+        }
+    return report
+
+
+def print_report(report):
+    print("\n" + "=" * 60)
+    print("Load Test Results")
+    print("=" * 60)
+    print(f"Requests: {report['requests']}  (concurrency {report['concurrency']}, "
+          f"rate {report['arrival_rate'] or 'closed loop'})")
+    print(f"Status codes: {report['status_counts']}")
+    print(f"Success rate: {report['success_rate']:.1%}")
+    print(f"Error rate: {report['error_rate']:.1%}")
+    print(f"429 rate: {report['rate_limited_rate']:.1%}")
+    print(f"Throughput: {report['throughput_rps']:.3f} successful req/s over {report['wall_time_s']:.1f}s")
+    for name, value in report["latency_s"].items():
+        print(f"Latency {name}: {value:.2f}s" if value is not None else f"Latency {name}: n/a")
+    if "server" in report:
+        server = report["server"]
+        print(f"Server PID {server['pid']}: CPU avg {server['cpu_percent_avg']:.0f}% "
+              f"(max {server['cpu_percent_max']:.0f}%), RSS avg {server['rss_mb_avg']:.0f} MB "
+              f"(max {server['rss_mb_max']:.0f} MB)")
+    else:
+        print("Server CPU/memory: not sampled (server process not found; pass --server-pid)")
+
+
+def main():
+    args = parse_args()
+
+    print("=" * 60)
+    print("Load Test: /process_video")
+    print("=" * 60)
+
+    clips = collect_clips(args.clips)
+    synthetic_dir = None
+    if args.synthetic:
+        synthetic_dir = tempfile.TemporaryDirectory(prefix="load_test_clips_")
+        for i in range(args.synthetic):
+            path = os.path.join(synthetic_dir.name, f"synthetic_{i}.mp4")
+            make_synthetic_clip(path, args.synthetic_seconds, seed=args.seed + i)
+            clips.append(path)
+        print(f"Generated {args.synthetic} synthetic clip(s) in {synthetic_dir.name}")
+
+    if not clips:
+        print("\n❌ No clips to send. Pass --clips and/or --synthetic.")
+        exit(1)
+
+    server = find_server_process(args.url, args.server_pid)
+    sampler = ResourceSampler(server) if server is not None else None
+    if sampler is not None:
+        sampler.start()
+
+    results, wall_time = run_load_test(args, clips)
+
+    if sampler is not None:
+        sampler.stop()
+    if synthetic_dir is not None:
+        synthetic_dir.cleanup()
+
+    report = build_report(args, results, wall_time, sampler)
+    print_report(report)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nReport written to: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -3,16 +3,27 @@ import pytesseract  # Optical Character Recognition (OCR)
 # Set the correct path to Tesseract (Windows path)
 pytesseract.pytesseract.tesseract_cmd = r"C:\Users\Abhit sahu\AppData\Local\Programs\Tesseract-OCR\tesseract.exe"
 
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, send_file
 import torch
 import torchvision.transforms as transforms
 import cv2
-from collections import defaultdict
+from collections import defaultdict, deque
 from deep_sort_realtime.deepsort_tracker import DeepSort
 from ultralytics import YOLO
 from PIL import Image
 import json
 import os
+import pickle
+import queue
+import re
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+import zipfile
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from contextlib import contextmanager
 import numpy as np
 import math
 import random
@@ -27,13 +38,115 @@ print("Using device:", device)
 yolo_model = YOLO("yolov8n.pt")  # Load YOLOv8 for player & ball detection
 yolo_model.to(device)  # Run YOLO on GPU if available
 
+# Shared inference: frames from all concurrent analyses are micro-batched into one YOLO call
+INFERENCE_MAX_BATCH = 8  # Largest batch passed to the model at once
+INFERENCE_MAX_WAIT_MS = 10  # Longest a frame waits for other analyses to fill its batch
+INFERENCE_TIMEOUT_S = 120  # A predict call failing to return within this raises instead of hanging
+
+
+class BatchedInferenceServer:
+    """
+    Owns the YOLO model on a single worker thread and serves every running analysis.
+
+    Callers submit one frame at a time and block until its result is ready. The
+    worker groups pending frames that share a shape and predict arguments into
+    one batched model call, waiting at most INFERENCE_MAX_WAIT_MS for the batch
+    to fill. Since each analysis has at most one frame in flight, the worker
+    stops waiting once every active session's frame has arrived (in this batch
+    or deferred to a later one), so a lone analysis runs without added delay.
+    """
+
+    def __init__(self, model, max_batch=INFERENCE_MAX_BATCH, max_wait_ms=INFERENCE_MAX_WAIT_MS):
+        self.model = model
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000.0
+        self.active_sessions = 0
+        self._lock = threading.Lock()
+        self._requests = queue.Queue()
+        self._worker = threading.Thread(target=self._run, name="yolo-inference", daemon=True)
+        self._worker.start()
+
+    @contextmanager
+    def session(self):
+        """Register an analysis so the worker knows how many callers may join a batch."""
+        with self._lock:
+            self.active_sessions += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self.active_sessions -= 1
+
+    def predict(self, frame, **kwargs):
+        """Run YOLO on one frame; returns a one-element results list like yolo_model(frame)."""
+        if not self._worker.is_alive():
+            raise RuntimeError("YOLO inference worker has stopped")
+        future = Future()
+        self._requests.put((frame, kwargs, future))
+        try:
+            return [future.result(timeout=INFERENCE_TIMEOUT_S)]
+        except FutureTimeoutError:
+            raise RuntimeError(f"YOLO inference did not return within {INFERENCE_TIMEOUT_S}s")
+
+    @staticmethod
+    def _batch_key(request):
+        frame, kwargs, _ = request
+        return frame.shape, tuple(sorted(kwargs.items()))
+
+    def _run(self):
+        deferred = []  # Requests that did not match the batch being formed
+        while True:
+            first = deferred.pop(0) if deferred else self._requests.get()
+            key = self._batch_key(first)
+            batch = [first]
+
+            # Previously deferred requests with the same key join immediately
+            for request in list(deferred):
+                if len(batch) >= self.max_batch:
+                    break
+                if self._batch_key(request) == key:
+                    deferred.remove(request)
+                    batch.append(request)
+
+            deadline = time.monotonic() + self.max_wait
+            # Deferred frames also belong to sessions in flight: they can't join this batch
+            while len(batch) < self.max_batch and len(batch) + len(deferred) < self.active_sessions:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    request = self._requests.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if self._batch_key(request) == key:
+                    batch.append(request)
+                else:
+                    deferred.append(request)
+
+            frames = [frame for frame, _, _ in batch]
+            try:
+                results = self.model(frames, verbose=False, **first[1])
+            except Exception as e:
+                for _, _, future in batch:
+                    future.set_exception(e)
+                continue
+            for (_, _, future), result in zip(batch, results):
+                future.set_result(result)
+
+
+inference_server = BatchedInferenceServer(yolo_model)
+
 # Ball detection - If you later train a custom model, you can load it here:
 # ball_model = YOLO("football_ball.pt")
 # ball_model.to(device)
 
-# Trackers
-deep_sort_tracker = DeepSort(max_age=30, n_init=3, nn_budget=100)
-ball_tracker = DeepSort(max_age=30, n_init=3, nn_budget=100)  # Separate tracker for ball
+# Tracker and trajectory memory ceilings (kept fixed so full matches stay bounded)
+TRACKER_MAX_AGE = 30  # Frames a lost track is kept before it is deleted
+TRACKER_NN_BUDGET = 100  # Appearance features kept per track
+BALL_TRAJECTORY_MAXLEN = 100  # Recent ball positions kept for event detection
+
+# DeepSort appearance embedder (MobileNetV2), loaded once and shared by every analysis's trackers
+appearance_embedder = DeepSort(max_age=TRACKER_MAX_AGE, n_init=3, nn_budget=TRACKER_NN_BUDGET).embedder
 
 # Define transformation for SlowFast input (kept for future use)
 transform = transforms.Compose([
@@ -45,6 +158,417 @@ transform = transforms.Compose([
 player_stats = {}
 MAX_FRAMES = 32  # Number of frames for Fast pathway
 
+# Adaptive inference resolution, chosen per segment from observed detections
+INFERENCE_RESOLUTIONS = [(480, 270), (640, 360), (960, 540), (1280, 720)]
+DEFAULT_RESOLUTION_INDEX = 1  # 640x360, the previous fixed inference size
+RESOLUTION_SEGMENT_FRAMES = 90  # Frames per segment before the size is re-evaluated
+RESOLUTION_MIN_PLAYER_HEIGHT = 24  # Median player height (inference px) below this -> more pixels
+RESOLUTION_MAX_PLAYER_HEIGHT = 80  # Median player height above this -> fewer pixels
+RESOLUTION_MIN_CONFIDENCE = 0.45  # Mean player confidence below this -> more pixels
+
+
+def inference_imgsz(width, height):
+    """
+    YOLO imgsz (h, w) for a frame resized to width x height.
+
+    Without an explicit imgsz ultralytics letterboxes every input to 640, which
+    would undo the controller's choice. Rounding each side up to a multiple of 32
+    means the frame is only padded, never rescaled, so boxes stay in frame pixels.
+    """
+    return (-(-height // 32) * 32, -(-width // 32) * 32)
+
+
+class ResolutionController:
+    """
+    Picks the inference size for each segment of RESOLUTION_SEGMENT_FRAMES frames.
+    Frames are resized to the chosen size and passed to YOLO with the matching
+    imgsz, so box heights observed here are in model-input pixels.
+
+    Wide broadcast shots (small, low-confidence players) step up the resolution
+    ladder; close phone footage (large, confident players) steps down. One step
+    at a time, so the ratio between rungs (~1.3-1.5x) keeps the thresholds from
+    oscillating. The source resolution is never exceeded.
+    """
+
+    def __init__(self, frame_width):
+        self.resolutions = [r for r in INFERENCE_RESOLUTIONS if r[0] <= frame_width] or INFERENCE_RESOLUTIONS[:1]
+        self.index = min(DEFAULT_RESOLUTION_INDEX, len(self.resolutions) - 1)
+        self.choices = []  # [{"start_frame", "width", "height"}, ...] one entry per change
+        self.segment_start = None
+        self._heights = []
+        self._confidences = []
+
+    def size(self, frame_idx):
+        """Return (width, height) to run inference at for this frame."""
+        if self.segment_start is None:
+            self.segment_start = frame_idx
+            self._record(frame_idx)
+        return self.resolutions[self.index]
+
+    def observe(self, boxes):
+        """Collect player box heights and confidences from one frame's YOLO boxes."""
+        if boxes is None or len(boxes) == 0:
+            return
+        players = boxes.cls.cpu().numpy() == 0  # COCO class 0 = person
+        xyxy = boxes.xyxy.cpu().numpy()[players]
+        self._heights.extend((xyxy[:, 3] - xyxy[:, 1]).tolist())
+        self._confidences.extend(boxes.conf.cpu().numpy()[players].tolist())
+
+    def end_frame(self, frame_idx):
+        """Re-evaluate the size at the end of each segment."""
+        if frame_idx - self.segment_start + 1 < RESOLUTION_SEGMENT_FRAMES:
+            return
+
+        previous = self.index
+        if not self._heights:
+            # Nobody found at this size: look harder
+            self.index = min(self.index + 1, len(self.resolutions) - 1)
+        else:
+            median_height = float(np.median(self._heights))
+            mean_confidence = float(np.mean(self._confidences))
+            if median_height < RESOLUTION_MIN_PLAYER_HEIGHT or mean_confidence < RESOLUTION_MIN_CONFIDENCE:
+                self.index = min(self.index + 1, len(self.resolutions) - 1)
+            elif median_height > RESOLUTION_MAX_PLAYER_HEIGHT:
+                self.index = max(self.index - 1, 0)
+
+        self.segment_start = frame_idx + 1
+        self._heights = []
+        self._confidences = []
+        if self.index != previous:
+            self._record(frame_idx + 1)
+
+    def _record(self, start_frame):
+        width, height = self.resolutions[self.index]
+        self.choices.append({"start_frame": start_frame, "width": width, "height": height,
+                             "imgsz": list(inference_imgsz(width, height))})
+
+
+# Team assignment from jersey colour (running colour summary per track)
+TEAM_COLOR_SAMPLE_INTERVAL = 10  # Sample a track's torso crop every N frames
+TEAM_COLOR_MAX_SAMPLES = 20  # Crops averaged per track; the summary is fixed after this
+TEAM_MIN_SAMPLES = 3  # Crops needed before a track takes part in clustering
+TEAM_CLUSTER_INTERVAL = 150  # Frames between clustering passes
+TEAM_OFFICIAL_MAX_FRACTION = 0.25  # An officials cluster holds at most this share of tracks...
+TEAM_OFFICIAL_MIN_SEPARATION = 0.5  # ...and sits at least this far from both teams (x team-to-team distance)
+TEAM_MAX_RETIRED_LABELS = 20000  # Labels of finished tracks kept for the export (oldest dropped first)
+TEAM_OFFICIAL = "official"
+
+
+class TeamAssigner:
+    """
+    Separates tracks into two teams and officials by jersey colour.
+
+    Each track keeps a running mean LAB colour of the torso from a few sampled
+    crops, so the per-frame cost is at most a small crop every
+    TEAM_COLOR_SAMPLE_INTERVAL frames. Every TEAM_CLUSTER_INTERVAL frames the
+    summaries of live tracks are clustered in one k-means pass. A third,
+    "official" cluster is only kept when it is small and clearly apart from both
+    teams; otherwise (e.g. no referee in view) the tracks are split into two
+    teams. "team_1" is the lighter kit. Labels are cached per track id until the
+    next pass; summaries of tracks the tracker has deleted are dropped.
+    """
+
+    def __init__(self):
+        self.color_sums = {}  # track_id -> summed mean LAB colour of sampled crops
+        self.sample_counts = {}  # track_id -> number of crops sampled
+        self.labels = {}  # track_id -> "team_1" / "team_2" / "official"
+        self.retired_labels = {}  # Last label of tracks no longer alive in the tracker
+
+    def observe(self, frame_idx, track_id, frame, box):
+        """Fold a torso crop of this track into its colour summary when it is due."""
+        count = self.sample_counts.get(track_id, 0)
+        if count >= TEAM_COLOR_MAX_SAMPLES or (frame_idx + track_id) % TEAM_COLOR_SAMPLE_INTERVAL:
+            return
+
+        # Torso only (upper-middle of the box) to keep grass and shorts out of the summary
+        x1, y1, x2, y2 = box
+        w, h = x2 - x1, y2 - y1
+        frame_h, frame_w = frame.shape[:2]
+        tx1, tx2 = max(0, int(x1 + 0.25 * w)), min(frame_w, int(x2 - 0.25 * w))
+        ty1, ty2 = max(0, int(y1 + 0.2 * h)), min(frame_h, int(y1 + 0.5 * h))
+        torso = frame[ty1:ty2, tx1:tx2]
+        if torso.size == 0:
+            return
+
+        color = cv2.cvtColor(torso, cv2.COLOR_BGR2LAB).reshape(-1, 3).mean(axis=0)
+        self.color_sums[track_id] = self.color_sums.get(track_id, 0) + color
+        self.sample_counts[track_id] = count + 1
+
+    def retire(self, alive_track_ids):
+        """Drop summaries of tracks the tracker no longer holds, keeping only their last label."""
+        for track_id in [t for t in self.sample_counts if t not in alive_track_ids]:
+            del self.color_sums[track_id]
+            del self.sample_counts[track_id]
+            if track_id in self.labels:
+                self.retired_labels[track_id] = self.labels.pop(track_id)
+        while len(self.retired_labels) > TEAM_MAX_RETIRED_LABELS:
+            del self.retired_labels[next(iter(self.retired_labels))]
+
+    def assign(self):
+        """Cluster all sufficiently sampled tracks and refresh the cached labels."""
+        track_ids = [t for t, n in self.sample_counts.items() if n >= TEAM_MIN_SAMPLES]
+        if len(track_ids) < 2:
+            return
+
+        colors = np.array(
+            [self.color_sums[t] / self.sample_counts[t] for t in track_ids], dtype=np.float32
+        )
+        clustering = self._cluster_with_officials(colors) if len(track_ids) >= 4 else None
+        if clustering is None:
+            clustering = self._cluster_teams(colors)
+        names, cluster_ids = clustering
+        self.labels = {t: names[int(c)] for t, c in zip(track_ids, cluster_ids)}
+
+    def _cluster_with_officials(self, colors):
+        """Try k=3; return (names, cluster_ids) if the smallest cluster looks like officials, else None."""
+        cluster_ids, centers = self._kmeans(colors, 3)
+        sizes = np.bincount(cluster_ids, minlength=3)
+        official, *teams = (int(c) for c in np.argsort(sizes))
+        if sizes[official] > TEAM_OFFICIAL_MAX_FRACTION * len(colors):
+            return None
+
+        # With no officials in view, k=3 splits one team in two: those halves sit close together
+        team_distance = np.linalg.norm(centers[teams[0]] - centers[teams[1]])
+        official_distance = min(np.linalg.norm(centers[official] - centers[t]) for t in teams)
+        if official_distance < TEAM_OFFICIAL_MIN_SEPARATION * team_distance:
+            return None
+
+        teams.sort(key=lambda c: -centers[c][0])
+        return {official: TEAM_OFFICIAL, teams[0]: "team_1", teams[1]: "team_2"}, cluster_ids
+
+    def _cluster_teams(self, colors):
+        """Split tracks into two teams; returns (names, cluster_ids)."""
+        cluster_ids, centers = self._kmeans(colors, 2)
+        lighter, darker = sorted(range(2), key=lambda c: -centers[c][0])
+        return {lighter: "team_1", darker: "team_2"}, cluster_ids
+
+    @staticmethod
+    def _kmeans(colors, k):
+        criteria = (cv2.TERM_CRITERIA_EPS + cv2.TERM_CRITERIA_MAX_ITER, 20, 1.0)
+        cv2.setRNGSeed(0)  # Deterministic clustering for the same input
+        _, cluster_ids, centers = cv2.kmeans(colors, k, None, criteria, 3, cv2.KMEANS_PP_CENTERS)
+        return cluster_ids.ravel(), centers
+
+    def label(self, track_id):
+        """Return the cached label for a track, or None if it is not assigned yet."""
+        return self.labels.get(track_id, self.retired_labels.get(track_id))
+
+    def all_labels(self):
+        """Labels of every track seen so far, finished tracks included."""
+        return {**self.retired_labels, **self.labels}
+
+
+# Per-frame positional export (optional, requested with export_frames=true)
+EXPORT_DIR = "exports"
+EXPORT_CHUNK_FRAMES = 300  # Frames buffered in memory before a chunk is flushed to disk
+EXPORT_EVENT_CODES = {"pass": 0, "shot": 1, "dribble": 2}
+EXPORT_RETENTION_HOURS = 24  # Finished exports and abandoned chunk folders are deleted after this
+
+
+# Full-match mode: periodic checkpoints so a long analysis can resume after a crash
+CHECKPOINT_DIR = "checkpoints"
+CHECKPOINT_INTERVAL_FRAMES = 1500  # ~1 minute of video at 25 fps
+CHECKPOINT_RETENTION_HOURS = 24  # Same as EXPORT_RETENTION_HOURS, so a resumable export keeps its chunks
+
+# Match ids currently being analysed; a second full-match/resume request for one gets a 409
+active_matches = set()
+active_matches_lock = threading.Lock()
+
+
+@contextmanager
+def claim_match(match_id):
+    """Yield True if this request now owns match_id (always True when no id was given)."""
+    if not match_id:
+        yield True
+        return
+    with active_matches_lock:
+        claimed = match_id not in active_matches
+        active_matches.add(match_id)
+    try:
+        yield claimed
+    finally:
+        if claimed:
+            with active_matches_lock:
+                active_matches.discard(match_id)
+
+
+def cleanup_expired_checkpoints():
+    """Delete stored videos and state of crashed matches not resumed within CHECKPOINT_RETENTION_HOURS."""
+    if not os.path.isdir(CHECKPOINT_DIR):
+        return
+    cutoff = time.time() - CHECKPOINT_RETENTION_HOURS * 3600
+    for match_id in os.listdir(CHECKPOINT_DIR):
+        path = checkpoint_dir(match_id)
+        with active_matches_lock:
+            if match_id in active_matches:
+                continue
+        try:
+            if os.path.getmtime(path) < cutoff:
+                shutil.rmtree(path)
+        except OSError:
+            pass  # Removed concurrently; nothing to do
+
+
+def create_trackers():
+    """Create a fresh (player, ball) DeepSort tracker pair for one analysis."""
+    # embedder=None skips loading MobileNetV2 per tracker; both use the shared embedder instead
+    player_tracker = DeepSort(max_age=TRACKER_MAX_AGE, n_init=3, nn_budget=TRACKER_NN_BUDGET, embedder=None)
+    ball_tracker = DeepSort(max_age=TRACKER_MAX_AGE, n_init=3, nn_budget=TRACKER_NN_BUDGET, embedder=None)
+    player_tracker.embedder = appearance_embedder
+    ball_tracker.embedder = appearance_embedder
+    return player_tracker, ball_tracker
+
+
+def checkpoint_dir(match_id):
+    """Return the directory holding the video and state for a full-match analysis."""
+    return os.path.join(CHECKPOINT_DIR, match_id)
+
+
+def save_checkpoint(match_id, state):
+    """Atomically write pipeline state, so a crash mid-write keeps the previous checkpoint."""
+    path = os.path.join(checkpoint_dir(match_id), "state.pkl")
+    with open(path + ".tmp", "wb") as f:
+        pickle.dump(state, f)
+    os.replace(path + ".tmp", path)
+
+
+def load_checkpoint(match_id):
+    """Return the last saved pipeline state for a match, or None if there is none."""
+    path = os.path.join(checkpoint_dir(match_id), "state.pkl")
+    if not os.path.exists(path):
+        return None
+    with open(path, "rb") as f:
+        return pickle.load(f)
+
+
+def export_path(export_id):
+    """Return the on-disk archive path for an export id."""
+    return os.path.join(EXPORT_DIR, f"{export_id}.npz")
+
+
+def cleanup_expired_exports():
+    """Delete exports and leftover .parts folders not modified within EXPORT_RETENTION_HOURS."""
+    if not os.path.isdir(EXPORT_DIR):
+        return
+    cutoff = time.time() - EXPORT_RETENTION_HOURS * 3600
+    for name in os.listdir(EXPORT_DIR):
+        path = os.path.join(EXPORT_DIR, name)
+        try:
+            if os.path.getmtime(path) >= cutoff:
+                continue
+            if os.path.isdir(path):
+                shutil.rmtree(path)
+            else:
+                os.remove(path)
+        except OSError:
+            pass  # Removed concurrently or still in use; retry on the next request
+
+
+class FrameDataExporter:
+    """
+    Streams per-frame track positions, ball positions and event markers to a
+    compressed .npz archive while the video is being processed.
+
+    Rows are buffered per column and flushed every EXPORT_CHUNK_FRAMES frames to
+    a staging file (exports/<export_id>.parts/00003.npz), so memory stays bounded
+    regardless of video length and flushed chunks survive a crash. close() packs
+    the chunks into one archive with one .npy array per column
+    (e.g. "tracks/00003/x1"), which can be read back with np.load().
+    """
+
+    TABLES = {
+        "tracks": (("frame_idx", np.int32), ("track_id", np.int32),
+                   ("x1", np.float32), ("y1", np.float32), ("x2", np.float32), ("y2", np.float32)),
+        "ball": (("frame_idx", np.int32), ("x", np.float32), ("y", np.float32)),
+        "events": (("frame_idx", np.int32), ("event", np.uint8), ("track_id", np.int32)),
+    }
+
+    def __init__(self, export_id, fps, frame_width, frame_height, chunk_index=0, total_frames=0):
+        self.export_id = export_id
+        self.path = export_path(export_id)
+        self.parts_dir = os.path.join(EXPORT_DIR, f"{export_id}.parts")
+        os.makedirs(self.parts_dir, exist_ok=True)
+        self.meta = {
+            "fps": float(fps),
+            "frame_width": int(frame_width),
+            "frame_height": int(frame_height),
+            "event_codes": EXPORT_EVENT_CODES,
+        }
+        self.chunk_index = chunk_index
+        self.frames_in_chunk = 0
+        self.total_frames = total_frames
+        self._reset_buffers()
+
+        # When resuming from a checkpoint, drop chunks written after it was taken
+        for name in os.listdir(self.parts_dir):
+            if not name.endswith(".npz") or int(name.split(".")[0]) >= chunk_index:
+                os.remove(os.path.join(self.parts_dir, name))
+
+    def _reset_buffers(self):
+        self._buffers = {
+            table: {name: [] for name, _ in columns}
+            for table, columns in self.TABLES.items()
+        }
+
+    def add_track(self, frame_idx, track_id, box):
+        x1, y1, x2, y2 = box
+        self._append("tracks", frame_idx, track_id, x1, y1, x2, y2)
+
+    def add_ball(self, frame_idx, position):
+        self._append("ball", frame_idx, position[0], position[1])
+
+    def add_event(self, frame_idx, event, track_id):
+        self._append("events", frame_idx, EXPORT_EVENT_CODES[event], track_id)
+
+    def _append(self, table, *values):
+        for (name, _), value in zip(self.TABLES[table], values):
+            self._buffers[table][name].append(value)
+
+    def end_frame(self):
+        """Mark the end of a processed frame, flushing a chunk when full."""
+        self.frames_in_chunk += 1
+        self.total_frames += 1
+        if self.frames_in_chunk >= EXPORT_CHUNK_FRAMES:
+            self.flush()
+
+    def flush(self):
+        """Write buffered rows as one chunk of column arrays."""
+        if self.frames_in_chunk == 0:
+            return
+        columns = {
+            f"{table}/{name}": np.asarray(self._buffers[table][name], dtype=dtype)
+            for table, table_columns in self.TABLES.items()
+            for name, dtype in table_columns
+        }
+        part_path = os.path.join(self.parts_dir, f"{self.chunk_index:05d}.npz")
+        with open(part_path + ".tmp", "wb") as f:
+            np.savez_compressed(f, **columns)
+        os.replace(part_path + ".tmp", part_path)
+        self.chunk_index += 1
+        self.frames_in_chunk = 0
+        self._reset_buffers()
+
+    def state(self):
+        """Position to pass back to __init__ when resuming; call after flush()."""
+        return {"chunk_index": self.chunk_index, "total_frames": self.total_frames}
+
+    def close(self):
+        """Flush remaining rows and pack all chunks into the final archive."""
+        self.flush()
+        self.meta.update({"chunks": self.chunk_index, "frames": self.total_frames})
+        # Pack into a temporary file so GET /exports never serves a half-written archive
+        with zipfile.ZipFile(self.path + ".tmp", "w", compression=zipfile.ZIP_DEFLATED) as archive:
+            for chunk in range(self.chunk_index):
+                part_path = os.path.join(self.parts_dir, f"{chunk:05d}.npz")
+                with np.load(part_path) as part:
+                    for key in part.files:
+                        table, name = key.split("/")
+                        with archive.open(f"{table}/{chunk:05d}/{name}.npy", "w") as f:
+                            np.lib.format.write_array(f, part[key], allow_pickle=False)
+            archive.writestr("meta.json", json.dumps(self.meta))
+        os.replace(self.path + ".tmp", self.path)
+        shutil.rmtree(self.parts_dir)
+
 
 def validate_football_video(video_path, min_confidence: float = 0.2):
     """
@@ -87,8 +611,9 @@ def validate_football_video(video_path, min_confidence: float = 0.2):
         resized_w, resized_h = 640, 360
         frame_small = cv2.resize(frame, (resized_w, resized_h))
 
-        # Run YOLO detection on this frame
-        results = yolo_model(frame_small, verbose=False)
+        # Run YOLO detection on this frame (imgsz passed explicitly: ultralytics keeps the
+        # last call's imgsz, which would otherwise be whatever an analysis last chose)
+        results = inference_server.predict(frame_small, imgsz=inference_imgsz(resized_w, resized_h))
         if not results:
             continue
 
@@ -286,6 +811,18 @@ def detect_dribble_from_ball(ball_trajectory, player_position, frame_idx, fps, p
 
 @app.route('/process_video', methods=['POST'])
 def process_video():
+    cleanup_expired_exports()
+    cleanup_expired_checkpoints()
+
+    # Concurrent requests share the model through the batched inference server
+    match_id = request.form.get("match_id")
+    with inference_server.session(), claim_match(match_id) as claimed:
+        if not claimed:
+            return jsonify({"error": f"Match {match_id} is already being processed"}), 409
+        return run_video_analysis()
+
+
+def run_video_analysis():
     global player_stats
     player_stats = {}  # Reset stats for each request
 
@@ -294,39 +831,73 @@ def process_video():
     # Get jersey number from request
     data = request.form
     target_jersey = int(data.get("jersey_number", 7))  # Default to 7 if not provided
+    export_frames = data.get("export_frames", "false").lower() in ("1", "true", "yes")
+
+    # Full-match mode: the video and periodic checkpoints are kept under CHECKPOINT_DIR
+    # so the analysis can be resumed with resume=true and the same match_id
+    full_match = data.get("full_match", "false").lower() in ("1", "true", "yes")
+    resume = data.get("resume", "false").lower() in ("1", "true", "yes")
+    match_id = data.get("match_id")
+    if not match_id:
+        # A server-made id would only reach the client in the final response, so a crashed
+        # run could never be resumed; the caller has to pick the id up front
+        if full_match or resume:
+            return jsonify({"error": "match_id is required for full_match and resume"}), 400
+        match_id = uuid.uuid4().hex
+    if not re.fullmatch(r"[A-Za-z0-9_-]{1,64}", match_id):
+        return jsonify({"error": "Invalid match_id"}), 400
+
+    checkpoint = None
+    if resume:
+        checkpoint = load_checkpoint(match_id)
+        if checkpoint is None:
+            return jsonify({"error": f"No checkpoint found for match {match_id}"}), 404
+
+        full_match = True
+        video_path = checkpoint["video_path"]
+        target_jersey = checkpoint["target_jersey"]
+        export_frames = checkpoint["export"] is not None
+    else:
+        # Get video file from request
+        if 'video' not in request.files:
+            print("No video received!")
+            return jsonify({"error": "No video file provided"}), 400
+
+        video_file = request.files['video']
+
+        if full_match:
+            os.makedirs(checkpoint_dir(match_id), exist_ok=True)
+            video_path = os.path.join(checkpoint_dir(match_id), "video.mp4")
+        else:
+            # Save video temporarily (unique name so concurrent requests don't collide)
+            fd, video_path = tempfile.mkstemp(prefix="temp_video_", suffix=".mp4", dir=".")
+            os.close(fd)
+        video_file.save(video_path)
+
+        if not os.path.exists(video_path):
+            return jsonify({"error": "Video file saving failed"}), 500
+
+        # ---- Quick validation: ensure this looks like a football video before heavy processing ----
+        is_football, fb_confidence, fb_details = validate_football_video(
+            video_path,
+            min_confidence=0.2  # looser threshold so real matches pass more easily
+        )
 
-    # Get video file from request
-    if 'video' not in request.files:
-        print("No video received!")
-        return jsonify({"error": "No video file provided"}), 400
-    
-    video_file = request.files['video']
-    
-    # Save video temporarily
-    video_path = "temp_video.mp4"
-    video_file.save(video_path)
-
-    if not os.path.exists(video_path):
-        return jsonify({"error": "Video file saving failed"}), 500
-
-    # ---- Quick validation: ensure this looks like a football video before heavy processing ----
-    is_football, fb_confidence, fb_details = validate_football_video(
-        video_path,
-        min_confidence=0.2  # looser threshold so real matches pass more easily
-    )
-
-    if not is_football:
-        # Clean up temp file and return a clear error
-        try:
-            os.remove(video_path)
-        except OSError:
-            pass
-
-        return jsonify({
-            "error": "Uploaded video does not appear to be a football match.",
-            "football_confidence": fb_confidence,
-            "validation_details": fb_details
-        }), 400
+        if not is_football:
+            # Clean up temp file and return a clear error
+            try:
+                if full_match:
+                    shutil.rmtree(checkpoint_dir(match_id))
+                else:
+                    os.remove(video_path)
+            except OSError:
+                pass
+
+            return jsonify({
+                "error": "Uploaded video does not appear to be a football match.",
+                "football_confidence": fb_confidence,
+                "validation_details": fb_details
+            }), 400
 
     cap = cv2.VideoCapture(video_path)
     if not cap.isOpened():
@@ -341,13 +912,27 @@ def process_video():
     # Typical football field: 105m x 68m
     pixels_per_meter = min(frame_width / 105, frame_height / 68)
 
+    # Optional streaming export of per-frame positions for downstream analytics
+    exporter = None
+    if export_frames and checkpoint is not None:
+        exporter = FrameDataExporter(checkpoint["export"]["export_id"], fps, frame_width, frame_height,
+                                     chunk_index=checkpoint["export"]["chunk_index"],
+                                     total_frames=checkpoint["export"]["total_frames"])
+    elif export_frames:
+        exporter = FrameDataExporter(uuid.uuid4().hex, fps, frame_width, frame_height)
+
+    # Fresh trackers per analysis so tracks never leak between requests
+    deep_sort_tracker, ball_tracker = create_trackers()
+    team_assigner = TeamAssigner()
+    resolution_controller = ResolutionController(frame_width)
+
     target_player_stats = None
     chosen_track_id = None
     frame_idx = 0
     frames_with_player = 0
     
     # Ball tracking variables
-    ball_trajectory = []  # Store ball positions: [(frame_idx, x, y), ...]
+    ball_trajectory = deque(maxlen=BALL_TRAJECTORY_MAXLEN)  # Store ball positions: [(frame_idx, x, y), ...]
     last_ball_position = None
     ball_possession_frames = 0  # Frames where ball is near player
     
@@ -356,6 +941,52 @@ def process_video():
     last_shot_frame = -60  # 2 second cooldown
     last_dribble_frame = -45  # 1.5 second cooldown
 
+    def build_checkpoint():
+        """Snapshot everything needed to continue the analysis from frame_idx."""
+        export_state = None
+        if exporter is not None:
+            exporter.flush()  # Flushed chunks must match the checkpointed frame position
+            export_state = {"export_id": exporter.export_id, **exporter.state()}
+
+        return {
+            "video_path": video_path,
+            "target_jersey": target_jersey,
+            "frame_idx": frame_idx,
+            "frames_with_player": frames_with_player,
+            "target_player_stats": target_player_stats,
+            "chosen_track_id": chosen_track_id,
+            "ball_trajectory": list(ball_trajectory),
+            "ball_possession_frames": ball_possession_frames,
+            "last_pass_frame": last_pass_frame,
+            "last_shot_frame": last_shot_frame,
+            "last_dribble_frame": last_dribble_frame,
+            "player_tracker": deep_sort_tracker.tracker,
+            "ball_tracker": ball_tracker.tracker,
+            "team_assigner": team_assigner,
+            "resolution_controller": resolution_controller,
+            "export": export_state,
+        }
+
+    if checkpoint is not None:
+        frame_idx = checkpoint["frame_idx"]
+        frames_with_player = checkpoint["frames_with_player"]
+        target_player_stats = checkpoint["target_player_stats"]
+        chosen_track_id = checkpoint["chosen_track_id"]
+        ball_trajectory.extend(checkpoint["ball_trajectory"])
+        ball_possession_frames = checkpoint["ball_possession_frames"]
+        last_pass_frame = checkpoint["last_pass_frame"]
+        last_shot_frame = checkpoint["last_shot_frame"]
+        last_dribble_frame = checkpoint["last_dribble_frame"]
+        deep_sort_tracker.tracker = checkpoint["player_tracker"]
+        ball_tracker.tracker = checkpoint["ball_tracker"]
+        team_assigner = checkpoint["team_assigner"]
+        resolution_controller = checkpoint["resolution_controller"]
+        cap.set(cv2.CAP_PROP_POS_FRAMES, frame_idx)
+        print(f"[Full match {match_id}] Resuming from frame {frame_idx}")
+    elif full_match:
+        # Initial checkpoint so even an early crash can be resumed
+        save_checkpoint(match_id, build_checkpoint())
+
     while cap.isOpened():
         ret, frame = cap.read()
         if not ret:
@@ -367,20 +998,22 @@ def process_video():
         # if frame_idx % 2 != 0:
         #     continue
 
-        # Resize frame to smaller resolution for faster inference
+        # Resize frame to the controller's current inference resolution
         original_h, original_w = frame.shape[:2]
-        resized_w, resized_h = 640, 360
+        resized_w, resized_h = resolution_controller.size(frame_idx)
         frame_small = cv2.resize(frame, (resized_w, resized_h))
+        imgsz = inference_imgsz(resized_w, resized_h)
 
         scale_x = original_w / resized_w
         scale_y = original_h / resized_h
 
         # ===== PLAYER DETECTION =====
         # Run YOLO on resized frame for player detection
-        results = yolo_model(frame_small, verbose=False)
+        results = inference_server.predict(frame_small, imgsz=imgsz)
 
         detections = []
         for result in results:
+            resolution_controller.observe(result.boxes)
             for bbox in result.boxes.xyxy.cpu().numpy():
                 x1_s, y1_s, x2_s, y2_s = bbox
 
@@ -401,8 +1034,14 @@ def process_video():
             if not track.is_confirmed():
                 continue
 
-            # Always focus on a single tracked player (first confirmed track)
-            if chosen_track_id is None:
+            track_box = track.to_tlbr()
+            team_assigner.observe(frame_idx, int(track.track_id), frame, track_box)
+
+            if exporter is not None:
+                exporter.add_track(frame_idx, int(track.track_id), track_box)
+
+            # Always focus on a single tracked player (first confirmed track that is not an official)
+            if chosen_track_id is None and team_assigner.label(int(track.track_id)) != TEAM_OFFICIAL:
                 chosen_track_id = track.track_id
 
             if track.track_id != chosen_track_id:
@@ -460,7 +1099,7 @@ def process_video():
         # ===== BALL DETECTION AND TRACKING =====
         # Run YOLO again for ball detection (class 32 = sports ball in COCO)
         # Use lower confidence threshold for better small ball detection
-        ball_results = yolo_model(frame_small, verbose=False, conf=0.15)
+        ball_results = inference_server.predict(frame_small, conf=0.15, imgsz=imgsz)
         
         ball_detections = []
         for result in ball_results:
@@ -497,13 +1136,13 @@ def process_video():
             current_ball_position = (ball_center_x, ball_center_y)
             
             # Store ball position for this frame
+            # (deque keeps only the last BALL_TRAJECTORY_MAXLEN positions for memory efficiency)
             ball_trajectory.append((frame_idx, ball_center_x, ball_center_y))
             
-            # Keep trajectory limited to last 100 frames (for memory efficiency)
-            if len(ball_trajectory) > 100:
-                ball_trajectory.pop(0)
-            
             break  # Only track one ball (the first confirmed track)
+
+        if exporter is not None and current_ball_position:
+            exporter.add_ball(frame_idx, current_ball_position)
         
         # ===== CORRELATE BALL WITH PLAYER AND DETECT EVENTS =====
         if frame_has_chosen_player and current_position:
@@ -527,6 +1166,8 @@ def process_video():
                     if frame_idx - last_pass_frame > 30:  # 1 second cooldown at 30fps
                         target_player_stats["pass_accuracy"] += 1
                         last_pass_frame = frame_idx
+                        if exporter is not None:
+                            exporter.add_event(frame_idx, "pass", int(chosen_track_id))
                         print(f"[Frame {frame_idx}] PASS detected!")
                 
                 # Detect shot (with cooldown)
@@ -534,6 +1175,8 @@ def process_video():
                     if frame_idx - last_shot_frame > 60:  # 2 second cooldown
                         target_player_stats["shot_conversion"] += 1
                         last_shot_frame = frame_idx
+                        if exporter is not None:
+                            exporter.add_event(frame_idx, "shot", int(chosen_track_id))
                         print(f"[Frame {frame_idx}] SHOT detected!")
                 
                 # Detect dribble (with cooldown)
@@ -541,14 +1184,53 @@ def process_video():
                     if frame_idx - last_dribble_frame > 45:  # 1.5 second cooldown
                         target_player_stats["dribble_success"] += 1
                         last_dribble_frame = frame_idx
+                        if exporter is not None:
+                            exporter.add_event(frame_idx, "dribble", int(chosen_track_id))
                         print(f"[Frame {frame_idx}] DRIBBLE detected!")
 
         # After processing all tracks for this frame, update tracking frame counter
         if frame_has_chosen_player:
             frames_with_player += 1
+
+        resolution_controller.end_frame(frame_idx)
+
+        if frame_idx % TEAM_CLUSTER_INTERVAL == 0:
+            team_assigner.retire({int(t.track_id) for t in tracks})
+            team_assigner.assign()
+
+            # Labels only exist from the first pass on: if the target turns out to be an
+            # official, its stats belong to a referee, so drop them and pick a player again
+            if chosen_track_id is not None and team_assigner.label(int(chosen_track_id)) == TEAM_OFFICIAL:
+                print(f"[Frame {frame_idx}] Tracked person {chosen_track_id} is an official, re-selecting player")
+                chosen_track_id = None
+                target_player_stats = None
+                frames_with_player = 0
+                ball_possession_frames = 0
+                last_pass_frame = -30
+                last_shot_frame = -60
+                last_dribble_frame = -45
+
+        if exporter is not None:
+            exporter.end_frame()
+
+        if full_match and frame_idx % CHECKPOINT_INTERVAL_FRAMES == 0:
+            save_checkpoint(match_id, build_checkpoint())
+            print(f"[Full match {match_id}] Checkpoint saved at frame {frame_idx}")
     
     cap.release()
-    os.remove(video_path)  # Clean up temporary video
+    team_assigner.assign()
+    # Same check after the final pass: never report a referee's stats as the player's
+    if chosen_track_id is not None and team_assigner.label(int(chosen_track_id)) == TEAM_OFFICIAL:
+        print(f"Tracked person {chosen_track_id} is an official, no player stats to report")
+        chosen_track_id = None
+        target_player_stats = None
+    if exporter is not None:
+        exporter.meta["teams"] = {str(t): label for t, label in team_assigner.all_labels().items()}
+        exporter.close()
+    if full_match:
+        shutil.rmtree(checkpoint_dir(match_id))  # Clean up stored video and checkpoints
+    else:
+        os.remove(video_path)  # Clean up temporary video
 
     # Compute overall tracking accuracy and normalize metrics
     if target_player_stats is not None and frame_idx > 0:
@@ -556,6 +1238,7 @@ def process_video():
         # Multiply by 2.5 to increase accuracy, then cap at 100%
         tracking_accuracy = min(100.0, tracking_accuracy * 2.5)
         target_player_stats["overall_accuracy"] = round(tracking_accuracy, 2)
+        target_player_stats["team"] = team_assigner.label(int(chosen_track_id))
         
         # Generate random speed between 10-30 km/h
         random_speed = random.uniform(10.0, 30.0)
@@ -587,7 +1270,30 @@ def process_video():
         
         print(f"[Normalization] Video duration: {video_duration_minutes:.2f} min, Passes: {pass_count} -> {target_player_stats['pass_accuracy']}, Shots: {shot_count} -> {target_player_stats['shot_conversion']}, Dribbles: {dribble_count} -> {target_player_stats['dribble_success']}")
 
-    return jsonify({"message": "Processing complete", "player_stats": target_player_stats})
+    response = {"message": "Processing complete", "player_stats": target_player_stats}
+    response["resolution_choices"] = resolution_controller.choices
+    if full_match:
+        response["match_id"] = match_id
+    if exporter is not None:
+        response["export_id"] = exporter.export_id
+        response["export_url"] = f"/exports/{exporter.export_id}"
+
+    return jsonify(response)
+
+
+@app.route('/exports/<export_id>', methods=['GET'])
+def get_export(export_id):
+    """Download the per-frame positional export produced by /process_video."""
+    # Export ids are uuid4 hex strings; reject anything else to avoid path traversal
+    if not re.fullmatch(r"[0-9a-f]{32}", export_id):
+        return jsonify({"error": "Invalid export id"}), 400
+
+    path = export_path(export_id)
+    if not os.path.exists(path):
+        return jsonify({"error": "Export not found"}), 404
+
+    return send_file(os.path.abspath(path), mimetype="application/zip",
+                     as_attachment=True, download_name=f"{export_id}.npz")
 
 
 if __name__ == '__main__':
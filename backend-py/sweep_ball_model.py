@@ -0,0 +1,238 @@
+"""
+Hyperparameter sweep for the football ball detection model on CPU.
+
+Trains every combination of model size, image size, batch size and augmentation
+preset as parallel CPU jobs, each limited to its own share of threads (ultralytics
+loads training data in-process on CPU, so there are no data loader workers). The
+dataset is decoded once up front into .npy files next to the images
+(ultralytics' cache="disk" format), so every trial reads the same decoded images
+instead of decoding JPEGs again. Trials that fall below the median of the others
+at the same epoch are pruned early. Results are written to
+runs/sweep/<name>/results.csv and results.json.
+
+Example:
+    python sweep_ball_model.py --models yolov8n.pt yolov8s.pt --imgsz 480 640 --jobs 4
+"""
+import argparse
+import csv
+import itertools
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+# Run from the folder this script lives in (dataset and runs/ paths are relative to it)
+os.chdir(os.path.dirname(os.path.abspath(__file__)))
+
+DATA_YAML = "football-ball-detection-4/data.yaml"
+
+# Augmentation presets ("default" matches train_ball_model.py)
+AUGMENTATIONS = {
+    "default": dict(hsv_h=0.015, hsv_s=0.7, hsv_v=0.4, degrees=10, translate=0.1,
+                    scale=0.5, flipud=0.0, fliplr=0.5, mosaic=1.0, mixup=0.1),
+    "light": dict(hsv_h=0.01, hsv_s=0.4, hsv_v=0.3, degrees=0, translate=0.1,
+                  scale=0.3, flipud=0.0, fliplr=0.5, mosaic=0.5, mixup=0.0),
+    "none": dict(hsv_h=0.0, hsv_s=0.0, hsv_v=0.0, degrees=0, translate=0.0,
+                 scale=0.0, flipud=0.0, fliplr=0.0, mosaic=0.0, mixup=0.0),
+}
+
+RESULT_FIELDS = ["trial", "model", "imgsz", "batch", "augment", "status", "epochs_run",
+                 "map50", "map50_95", "precision", "recall", "minutes", "weights"]
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Parallel CPU hyperparameter sweep for the ball model")
+    parser.add_argument("--name", default="ball_sweep", help="Sweep name (results go to runs/sweep/<name>)")
+    parser.add_argument("--models", nargs="+", default=["yolov8n.pt", "yolov8s.pt"])
+    parser.add_argument("--imgsz", nargs="+", type=int, default=[480, 640])
+    parser.add_argument("--batch", nargs="+", type=int, default=[8])
+    parser.add_argument("--augment", nargs="+", default=["default", "light"], choices=sorted(AUGMENTATIONS))
+    parser.add_argument("--epochs", type=int, default=30, help="Maximum epochs per trial")
+    parser.add_argument("--jobs", type=int, default=2, help="Trials trained in parallel")
+    parser.add_argument("--threads-per-job", type=int, default=None,
+                        help="CPU threads per trial (default: CPU count / jobs)")
+    parser.add_argument("--prune-after", type=int, default=5,
+                        help="First epoch at which a trial can be pruned")
+    parser.add_argument("--prune-min-trials", type=int, default=2,
+                        help="Other trials that must have reached an epoch before pruning against them")
+    parser.add_argument("--seed", type=int, default=0)
+    return parser.parse_args()
+
+
+def cache_dataset():
+    """Decode every train/val image once into a .npy file next to it (ultralytics cache="disk" format)."""
+    import cv2
+    from ultralytics.data.utils import check_det_dataset, IMG_FORMATS
+
+    dataset = check_det_dataset(DATA_YAML)
+    decoded = skipped = 0
+    for split in ("train", "val"):
+        image_dir = dataset[split]
+        for name in sorted(os.listdir(image_dir)):
+            if name.rsplit(".", 1)[-1].lower() not in IMG_FORMATS:
+                continue
+            npy_path = os.path.join(image_dir, os.path.splitext(name)[0] + ".npy")
+            if os.path.exists(npy_path):
+                skipped += 1
+                continue
+            np.save(npy_path, cv2.imread(os.path.join(image_dir, name)), allow_pickle=False)
+            decoded += 1
+    print(f"Dataset cache: {decoded} images decoded, {skipped} already cached")
+
+
+def trial_configs(args):
+    for model, imgsz, batch, augment in itertools.product(args.models, args.imgsz, args.batch, args.augment):
+        yield {
+            "trial": f"{os.path.splitext(os.path.basename(model))[0]}_{imgsz}_b{batch}_{augment}",
+            "model": model,
+            "imgsz": imgsz,
+            "batch": batch,
+            "augment": augment,
+        }
+
+
+def write_json(path, data):
+    """Write JSON atomically so parallel trials never read a half-written file."""
+    with open(path + ".tmp", "w") as f:
+        json.dump(data, f)
+    os.replace(path + ".tmp", path)
+
+
+def should_prune(progress_dir, trial, epoch, fitness, prune_after, min_trials):
+    """Median stopping rule: prune if below the median mAP50 other trials had at this epoch."""
+    if epoch < prune_after:
+        return False
+    others = []
+    for name in os.listdir(progress_dir):
+        if not name.endswith(".json") or name == f"{trial}.json":
+            continue
+        with open(os.path.join(progress_dir, name)) as f:
+            history = json.load(f)["map50"]
+        if len(history) >= epoch:
+            others.append(history[epoch - 1])
+    return len(others) >= min_trials and fitness < float(np.median(others))
+
+
+def run_trial(config, sweep_dir, args, threads):
+    """Train one configuration in a worker process; returns a results row."""
+    import torch
+    from ultralytics import YOLO
+
+    torch.set_num_threads(threads)
+    progress_dir = os.path.join(sweep_dir, "progress")
+    progress_path = os.path.join(progress_dir, f"{config['trial']}.json")
+    history = {"map50": [], "pruned": False}
+    start = time.time()
+
+    def on_pretrain_routine_end(trainer):
+        # The trainer's select_device() resets torch to ultralytics' own thread count
+        torch.set_num_threads(threads)
+
+    def on_fit_epoch_end(trainer):
+        fitness = float(trainer.metrics.get("metrics/mAP50(B)", 0.0))
+        history["map50"].append(fitness)
+        epoch = len(history["map50"])
+        if should_prune(progress_dir, config["trial"], epoch, fitness, args.prune_after, args.prune_min_trials):
+            history["pruned"] = True
+            trainer.stop = True  # Ends training after this epoch
+            print(f"[{config['trial']}] Pruned at epoch {epoch} (mAP50 {fitness:.4f})")
+        write_json(progress_path, history)
+
+    row = {**config, "status": "failed", "epochs_run": 0, "map50": None, "map50_95": None,
+           "precision": None, "recall": None, "weights": None}
+    try:
+        model = YOLO(config["model"])
+        model.add_callback("on_pretrain_routine_end", on_pretrain_routine_end)
+        model.add_callback("on_fit_epoch_end", on_fit_epoch_end)
+        results = model.train(
+            data=DATA_YAML,
+            epochs=args.epochs,
+            imgsz=config["imgsz"],
+            batch=config["batch"],
+            device="cpu",
+            workers=0,  # Forced to 0 on CPU by ultralytics anyway
+            cache="disk",  # Reuses the .npy files written by cache_dataset()
+            optimizer="AdamW",
+            lr0=0.01,
+            weight_decay=0.0005,
+            seed=args.seed,
+            deterministic=True,
+            project=sweep_dir,
+            name=config["trial"],
+            exist_ok=True,
+            plots=False,
+            verbose=False,
+            **AUGMENTATIONS[config["augment"]],
+        )
+        row.update({
+            "status": "pruned" if history["pruned"] else "completed",
+            "epochs_run": len(history["map50"]),
+            "map50": float(results.box.map50),
+            "map50_95": float(results.box.map),
+            "precision": float(results.box.mp),
+            "recall": float(results.box.mr),
+            "weights": os.path.join(sweep_dir, config["trial"], "weights", "best.pt"),
+        })
+    except Exception as e:
+        print(f"[{config['trial']}] Failed: {e}")
+    row["minutes"] = round((time.time() - start) / 60.0, 2)
+    return row
+
+
+def main():
+    args = parse_args()
+    threads = args.threads_per_job or max(1, (os.cpu_count() or 1) // args.jobs)
+    # OpenMP/BLAS read these once, when torch is first imported; set them before
+    # cache_dataset() imports it here and before the workers are spawned
+    for var in ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS"):
+        os.environ[var] = str(threads)
+    sweep_dir = os.path.abspath(os.path.join("runs", "sweep", args.name))
+    progress_dir = os.path.join(sweep_dir, "progress")
+    os.makedirs(progress_dir, exist_ok=True)
+    for name in os.listdir(progress_dir):
+        os.remove(os.path.join(progress_dir, name))  # Don't prune against a previous run's trials
+    configs = list(trial_configs(args))
+
+    print("="*60)
+    print("Football Ball Detection Hyperparameter Sweep (CPU)")
+    print("="*60)
+    print(f"  - Trials: {len(configs)} ({args.jobs} in parallel, {threads} threads each)")
+    print(f"  - Epochs: up to {args.epochs} (pruning from epoch {args.prune_after})")
+    print(f"  - Results: {sweep_dir}")
+
+    cache_dataset()
+
+    # Spawned (not forked) workers import torch fresh, so they pick up the thread limits above
+    rows = []
+    with ProcessPoolExecutor(max_workers=args.jobs, mp_context=multiprocessing.get_context("spawn")) as pool:
+        futures = [pool.submit(run_trial, config, sweep_dir, args, threads) for config in configs]
+        for future in as_completed(futures):
+            row = future.result()
+            rows.append(row)
+            print(f"[{row['trial']}] {row['status']} after {row['epochs_run']} epochs, "
+                  f"mAP50={row['map50']}, {row['minutes']} min")
+
+    rows.sort(key=lambda r: (r["map50"] is not None, r["map50"] or 0), reverse=True)
+    with open(os.path.join(sweep_dir, "results.csv"), "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=RESULT_FIELDS)
+        writer.writeheader()
+        writer.writerows(rows)
+    with open(os.path.join(sweep_dir, "results.json"), "w") as f:
+        json.dump(rows, f, indent=2)
+
+    print("\n" + "="*60)
+    print("Sweep Results (best first)")
+    print("="*60)
+    for row in rows:
+        map50 = f"{row['map50']:.4f}" if row["map50"] is not None else "n/a"
+        print(f"{row['trial']:<35}{row['status']:<11}{row['epochs_run']:>4} ep  mAP50 {map50}  {row['minutes']} min")
+    print(f"\nResults saved to: {os.path.join(sweep_dir, 'results.csv')}")
+    print("Benchmark the best trials on CPU with:")
+    print("  python test_ball_model.py --benchmark --models <trial weights>")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,50 +1,272 @@
 from ultralytics import YOLO
+from ultralytics.data.utils import check_det_dataset
+import argparse
+import glob
+import json
+import multiprocessing
 import os
+import shutil
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
 
-# Set working directory
-os.chdir(r"C:\Users\Abhit sahu\football_scout_ai\backend-py")
-
-print("="*60)
-print("Model Evaluation")
-print("="*60)
-
-# Check if model exists
-model_path = "runs/detect/football_ball_detection/weights/best.pt"
-if not os.path.exists(model_path):
-    print(f"\n❌ Model not found at: {model_path}")
-    print("Please train the model first using: python train_ball_model.py")
-    exit(1)
-
-print(f"\nLoading trained model from: {model_path}")
-model = YOLO(model_path)
-
-print("\nEvaluating on validation set...")
-# Test on validation set
-results = model.val(
-    data="football-ball-detection-4/data.yaml",
-    imgsz=640,
-    conf=0.25,  # Confidence threshold
-    iou=0.45,   # IoU threshold for NMS
-)
-
-print("\n" + "="*60)
-print("Validation Results:")
-print("="*60)
-print(f"mAP50: {results.box.map50:.4f}")  # Mean Average Precision at IoU=0.5
-print(f"mAP50-95: {results.box.map:.4f}")  # Mean Average Precision at IoU=0.5:0.95
-print(f"Precision: {results.box.mp:.4f}")
-print(f"Recall: {results.box.mr:.4f}")
-
-print("\n" + "="*60)
-print("Interpretation:")
-print("="*60)
-print("mAP50: Mean Average Precision at IoU=0.5 (higher is better, 0-1 scale)")
-print("  - >0.9: Excellent")
-print("  - 0.8-0.9: Very Good")
-print("  - 0.7-0.8: Good")
-print("  - <0.7: Needs improvement")
-print("\nIf mAP50 is low, consider:")
-print("  - Training for more epochs")
-print("  - Using a larger model (yolov8m.pt or yolov8l.pt)")
-print("  - Increasing image size (if GPU memory allows)")
+import cv2
+import numpy as np
+import psutil
 
+# Run from the folder this script lives in (dataset and runs/ paths are relative to it)
+os.chdir(os.path.dirname(os.path.abspath(__file__)))
+
+DATA_YAML = "football-ball-detection-4/data.yaml"
+TRAINED_MODEL = "runs/detect/football_ball_detection/weights/best.pt"
+BENCHMARK_OUTPUT = "runs/benchmark/pareto.json"
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Evaluate the trained ball detection model")
+    parser.add_argument("--benchmark", action="store_true",
+                        help="Benchmark accuracy vs CPU latency for several models and image sizes")
+    parser.add_argument("--models", nargs="+",
+                        default=["yolov8n.pt", "yolov8s.pt", "yolov8m.pt", TRAINED_MODEL],
+                        help="Candidate weights for --benchmark")
+    parser.add_argument("--imgsz", nargs="+", type=int, default=[320, 480, 640],
+                        help="Image sizes for --benchmark")
+    parser.add_argument("--export", nargs="*", default=[],
+                        help="Also benchmark exported variants, e.g. --export onnx openvino")
+    parser.add_argument("--frames", type=int, default=50,
+                        help="Validation images timed per model/size for latency")
+    parser.add_argument("--output", default=BENCHMARK_OUTPUT, help="Where to write the Pareto table (JSON)")
+    return parser.parse_args()
+
+
+def evaluate_trained_model():
+    print("="*60)
+    print("Model Evaluation")
+    print("="*60)
+
+    # Check if model exists
+    model_path = TRAINED_MODEL
+    if not os.path.exists(model_path):
+        print(f"\n❌ Model not found at: {model_path}")
+        print("Please train the model first using: python train_ball_model.py")
+        exit(1)
+
+    print(f"\nLoading trained model from: {model_path}")
+    model = YOLO(model_path)
+
+    print("\nEvaluating on validation set...")
+    # Test on validation set
+    results = model.val(
+        data=DATA_YAML,
+        imgsz=640,
+        conf=0.25,  # Confidence threshold
+        iou=0.45,   # IoU threshold for NMS
+    )
+
+    print("\n" + "="*60)
+    print("Validation Results:")
+    print("="*60)
+    print(f"mAP50: {results.box.map50:.4f}")  # Mean Average Precision at IoU=0.5
+    print(f"mAP50-95: {results.box.map:.4f}")  # Mean Average Precision at IoU=0.5:0.95
+    print(f"Precision: {results.box.mp:.4f}")
+    print(f"Recall: {results.box.mr:.4f}")
+
+    print("\n" + "="*60)
+    print("Interpretation:")
+    print("="*60)
+    print("mAP50: Mean Average Precision at IoU=0.5 (higher is better, 0-1 scale)")
+    print("  - >0.9: Excellent")
+    print("  - 0.8-0.9: Very Good")
+    print("  - 0.7-0.8: Good")
+    print("  - <0.7: Needs improvement")
+    print("\nIf mAP50 is low, consider:")
+    print("  - Training for more epochs")
+    print("  - Using a larger model (yolov8m.pt or yolov8l.pt)")
+    print("  - Increasing image size (if GPU memory allows)")
+    print("\nTo compare models by CPU latency, run: python test_ball_model.py --benchmark")
+
+
+def candidate_variants(models, image_sizes, export_formats):
+    """Yield (name, format, imgsz) for every model/size, plus exported variants."""
+    for model_path in models:
+        # Bare names like yolov8s.pt are downloaded by ultralytics; local paths must exist
+        if os.path.dirname(model_path) and not os.path.exists(model_path):
+            print(f"⚠ Skipping missing model: {model_path}")
+            continue
+        for imgsz in image_sizes:
+            yield model_path, "pytorch", imgsz
+            for fmt in export_formats:
+                yield model_path, fmt, imgsz
+
+
+def variant_weights(model_path, fmt, imgsz):
+    """Return the weights to benchmark, exporting first for non-PyTorch formats."""
+    if fmt == "pytorch":
+        return model_path
+    # Exported graphs are fixed-size, so export once per image size
+    print(f"Exporting {model_path} to {fmt} at imgsz={imgsz}...")
+    exported = YOLO(model_path).export(format=fmt, imgsz=imgsz, device="cpu")
+    return size_tagged_export(exported, imgsz)
+
+
+def size_tagged_export(exported, imgsz):
+    """
+    Move an export to a path that includes its image size.
+
+    Ultralytics names exports after the weights only (best.onnx,
+    best_openvino_model/), so the next size would overwrite this one. Files get
+    best_imgsz320.onnx; folders keep their format suffix, which ultralytics uses
+    to detect the format (best_imgsz320_openvino_model/).
+    """
+    exported = str(exported).rstrip("/\\")
+    folder, name = os.path.split(exported)
+    if os.path.isdir(exported):
+        stem, fmt, suffix = name.rsplit("_", 2)
+        tagged = os.path.join(folder, f"{stem}_imgsz{imgsz}_{fmt}_{suffix}")
+        shutil.rmtree(tagged, ignore_errors=True)
+    else:
+        stem, ext = os.path.splitext(name)
+        tagged = os.path.join(folder, f"{stem}_imgsz{imgsz}{ext}")
+    shutil.move(exported, tagged)
+    return tagged
+
+
+def measure_latency(model, images, imgsz, warmup=3):
+    """Time single-frame CPU inference on decoded images; returns (mean ms/frame, p95 ms/frame)."""
+    for image in images[:warmup]:
+        model.predict(image, imgsz=imgsz, device="cpu", verbose=False)
+
+    timings = []
+    for image in images:
+        start = time.perf_counter()
+        model.predict(image, imgsz=imgsz, device="cpu", verbose=False)
+        timings.append((time.perf_counter() - start) * 1000.0)
+    return float(np.mean(timings)), float(np.percentile(timings, 95))
+
+
+def peak_rss_bytes():
+    """Peak resident memory of this process so far."""
+    memory = psutil.Process().memory_info()
+    if hasattr(memory, "peak_wset"):  # Windows
+        return memory.peak_wset
+    import resource
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024  # Linux reports KiB
+
+
+def benchmark_candidate(weights, imgsz, image_paths, dataset_names):
+    """
+    Benchmark one model/size; meant to run in its own fresh process.
+
+    Frames are decoded before timing, as main.py hands YOLO decoded frames.
+    Running each candidate in a new process keeps earlier models out of the
+    memory figures: rss_mb is this process's peak while timing, model_rss_mb
+    how far loading and running the model raised that peak.
+    """
+    images = [cv2.imread(path) for path in image_paths]
+    baseline_rss = peak_rss_bytes()
+
+    model = YOLO(weights, task="detect")
+    ms_per_frame, p95_ms = measure_latency(model, images, imgsz)
+    peak_rss = peak_rss_bytes()
+
+    # Stock COCO weights don't share the dataset's classes, so their mAP would be
+    # meaningless; they still get timed as a latency baseline.
+    accuracy = {"map50": None, "map50_95": None, "precision": None, "recall": None}
+    if dataset_names <= set(model.names.values()):
+        results = model.val(data=DATA_YAML, imgsz=imgsz, conf=0.25, iou=0.45,
+                            device="cpu", plots=False, verbose=False)
+        accuracy = {
+            "map50": float(results.box.map50),
+            "map50_95": float(results.box.map),
+            "precision": float(results.box.mp),
+            "recall": float(results.box.mr),
+        }
+
+    return {
+        **accuracy,
+        "ms_per_frame": ms_per_frame,
+        "p95_ms_per_frame": p95_ms,
+        "fps": 1000.0 / ms_per_frame,
+        "rss_mb": peak_rss / 1024 ** 2,
+        "model_rss_mb": (peak_rss - baseline_rss) / 1024 ** 2,
+    }
+
+
+def mark_pareto(rows):
+    """Flag rows not beaten on both accuracy (mAP50) and latency by another row."""
+    for row in rows:
+        row["pareto"] = row["map50"] is not None and not any(
+            other is not row and other["map50"] is not None
+            and other["ms_per_frame"] <= row["ms_per_frame"] and other["map50"] >= row["map50"]
+            and (other["ms_per_frame"] < row["ms_per_frame"] or other["map50"] > row["map50"])
+            for other in rows
+        )
+
+
+def benchmark(args):
+    print("="*60)
+    print("Model Benchmark (accuracy vs CPU latency)")
+    print("="*60)
+
+    dataset = check_det_dataset(DATA_YAML)
+    dataset_names = set(dataset["names"].values())
+    val_images = sorted(
+        path for ext in ("jpg", "jpeg", "png")
+        for path in glob.glob(os.path.join(dataset["val"], f"*.{ext}"))
+    )[:args.frames]
+    if not val_images:
+        print(f"\n❌ No validation images found in: {dataset['val']}")
+        exit(1)
+
+    rows = []
+    failed = []
+    for name, fmt, imgsz in candidate_variants(args.models, args.imgsz, args.export):
+        print(f"\nBenchmarking {name} [{fmt}] at imgsz={imgsz}...")
+        # One broken candidate (e.g. a missing ONNX/OpenVINO backend) must not lose the other rows
+        try:
+            weights = variant_weights(name, fmt, imgsz)
+            with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as pool:
+                metrics = pool.submit(benchmark_candidate, str(weights), imgsz, val_images, dataset_names).result()
+        except Exception as e:
+            print(f"⚠ Failed: {e}")
+            failed.append({"model": name, "format": fmt, "imgsz": imgsz, "error": str(e)})
+            continue
+        rows.append({
+            "model": name,
+            "format": fmt,
+            "weights": str(weights),
+            "imgsz": imgsz,
+            **metrics,
+        })
+
+    mark_pareto(rows)
+    rows.sort(key=lambda r: r["ms_per_frame"])
+
+    print("\n" + "="*60)
+    print("Results (sorted by latency, * = Pareto-optimal)")
+    print("="*60)
+    print(f"{'':2}{'model':<45}{'format':<10}{'imgsz':>6}{'mAP50':>8}{'ms/frame':>10}{'fps':>8}{'model MB':>10}")
+    for row in rows:
+        map50 = f"{row['map50']:.4f}" if row["map50"] is not None else "n/a"
+        print(f"{'* ' if row['pareto'] else '  '}{row['model']:<45}{row['format']:<10}{row['imgsz']:>6}"
+              f"{map50:>8}{row['ms_per_frame']:>10.1f}{row['fps']:>8.1f}{row['model_rss_mb']:>10.0f}")
+
+    os.makedirs(os.path.dirname(args.output), exist_ok=True)
+    with open(args.output, "w") as f:
+        json.dump({"data": DATA_YAML, "frames_timed": len(val_images), "rows": rows, "failed": failed}, f, indent=2)
+    if failed:
+        print(f"\n⚠ {len(failed)} candidate(s) failed:")
+        for row in failed:
+            print(f"  {row['model']} [{row['format']}] at imgsz={row['imgsz']}: {row['error']}")
+    print(f"\nPareto table saved to: {args.output}")
+    print("To promote the best model under a latency budget, run:")
+    print(f"  python copy_trained_model.py --benchmark {args.output} --latency-budget-ms 50")
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    if args.benchmark:
+        benchmark(args)
+    else:
+        evaluate_trained_model()
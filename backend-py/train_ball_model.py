@@ -1,8 +1,9 @@
 from ultralytics import YOLO
 import os
+import torch
 
 # Set working directory to where the dataset is located
-os.chdir(r"C:\Users\Abhit sahu\football_scout_ai\backend-py")
+os.chdir(os.path.dirname(os.path.abspath(__file__)))
 
 print("="*60)
 print("Football Ball Detection Model Training")
@@ -36,7 +37,7 @@ results = model.train(
     batch=16,  # Adjust based on your GPU memory (reduce if you get CUDA out of memory)
     
     # Device (0 = GPU, 'cpu' = CPU)
-    device='cpu',  # Auto-detect: use GPU if available, otherwise CPU
+    device=0 if torch.cuda.is_available() else 'cpu',  # Auto-detect: use GPU if available, otherwise CPU
     
     # Learning rate (usually auto, but can be set manually)
     lr0=0.01,  # Initial learning rate
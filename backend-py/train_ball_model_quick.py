@@ -1,8 +1,9 @@
 from ultralytics import YOLO
 import os
+import torch
 
 # Set working directory
-os.chdir(r"C:\Users\Abhit sahu\football_scout_ai\backend-py")
+os.chdir(os.path.dirname(os.path.abspath(__file__)))
 
 print("="*60)
 print("Quick Test Training (10 epochs)")
@@ -19,7 +20,7 @@ results = model.train(
     epochs=10,  # Quick test
     imgsz=640,
     batch=8,    # Smaller batch for testing
-    device=0,   # GPU if available
+    device=0 if torch.cuda.is_available() else 'cpu',  # GPU if available, otherwise CPU
     project="runs/detect",
     name="football_ball_test",
     verbose=True,